@@ -1,13 +1,42 @@
 import os
+import re
+import sys
+import json
+import functools
+import random
+import marshal
+import cProfile
+import pstats
+import itertools
+import collections
+import atexit
+import queue
+import gzip
+import hashlib
+import mimetypes
+import urllib.request
+import pathlib
 import sqlite3
+import threading
+import bisect
+import time
+import glob
+import shutil
+import statistics
+import math
 import click
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, make_response
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, make_response, send_from_directory, abort, g, has_request_context, has_app_context
+from flask.sessions import SecureCookieSessionInterface
+from werkzeug.security import check_password_hash, generate_password_hash, safe_join
 from dotenv import load_dotenv
 import pdfkit
 import tempfile
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 load_dotenv()
 
@@ -17,15 +46,228 @@ app.secret_key = 'silico_battles_2025_winner'
 # database stuff
 DB_PATH = 'podium.db'
 
-# connects to the database
+# competitions
+# one server can host many competitions, each with its own database file in
+# COMPETITIONS_DIR. a competition is picked by a /c/<slug>/ url prefix or, when
+# COMPETITION_DOMAIN is set, by a <slug>.<domain> subdomain. everything else
+# uses DB_PATH like before. open connections and per-competition caches live
+# in an LRU of COMPETITION_CACHE_SIZE competitions.
+COMPETITIONS_DIR = os.environ.get('COMPETITIONS_DIR', 'competitions')
+COMPETITION_DOMAIN = os.environ.get('COMPETITION_DOMAIN')
+COMPETITION_CACHE_SIZE = int(os.environ.get('COMPETITION_CACHE_SIZE', 16))
+COMPETITION_POOL_SIZE = 4
+COMPETITION_SLUG_RE = re.compile(r'^[a-z0-9][a-z0-9-]{0,62}$')
+
+def get_competition_db_path(slug):
+    return os.path.join(COMPETITIONS_DIR, f'{slug}.db') if slug else DB_PATH
+
+def list_competition_slugs():
+    """The default database plus every competition file on disk."""
+    slugs = [None]
+    for path in sorted(glob.glob(os.path.join(COMPETITIONS_DIR, '*.db'))):
+        slug = os.path.splitext(os.path.basename(path))[0]
+        if COMPETITION_SLUG_RE.match(slug):
+            slugs.append(slug)
+    return slugs
+
+class CompetitionMiddleware:
+    """Moves a /c/<slug> prefix from PATH_INFO to SCRIPT_NAME, so routes and
+    url_for work unchanged under it, and records the slug in the environ."""
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        slug = None
+        parts = environ.get('PATH_INFO', '').split('/', 3)
+        if len(parts) >= 3 and parts[1] == 'c' and COMPETITION_SLUG_RE.match(parts[2]):
+            slug = parts[2]
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + f'/c/{slug}'
+            environ['PATH_INFO'] = '/' + (parts[3] if len(parts) > 3 else '')
+        elif COMPETITION_DOMAIN:
+            host = environ.get('HTTP_HOST', '').split(':')[0].lower()
+            subdomain = host[:-len(COMPETITION_DOMAIN) - 1] if host.endswith('.' + COMPETITION_DOMAIN) else ''
+            if COMPETITION_SLUG_RE.match(subdomain):
+                slug = subdomain
+        environ['podium.competition'] = slug
+        return self.wsgi_app(environ, start_response)
+
+app.wsgi_app = CompetitionMiddleware(app.wsgi_app)
+
+class PooledConnection(sqlite3.Connection):
+    """close() hands the connection back to its competition's pool."""
+    def close(self):
+        self.competition.release(self)
+
+    def close_for_real(self):
+        super().close()
+
+class Competition:
+    def __init__(self, slug):
+        self.slug = slug
+        self.db_path = get_competition_db_path(slug)
+        self.closed = False
+        self._idle = []
+        self._lock = threading.Lock()
+        self._migrated = False
+        self._migrate_lock = threading.Lock()
+        # derived caches, dropped with the competition
+        self.view_cache = SingleFlight()
+        self.name_indexes = {}
+        self.name_indexes_lock = threading.Lock()
+        # request profiling, so one competition's admins can't switch it on
+        # for everyone or read another competition's requests
+        self.profiler_settings = dict(PROFILE_DEFAULT_SETTINGS)
+        self.captured_profiles = collections.deque(maxlen=PROFILE_BUFFER_SIZE)
+        self.captured_profiles_lock = threading.Lock()
+
+    @property
+    def title(self):
+        return self.slug.replace('-', ' ').title() if self.slug else 'Sillico Battles v21.1'
+
+    def connect(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        conn.competition = self
+        # a database from an older version lacks DataVersion and friends,
+        # upgrade it once before anything reads from it
+        if not self._migrated:
+            with self._migrate_lock:
+                if not self._migrated:
+                    try:
+                        migrate_db(conn)
+                    except sqlite3.Error:
+                        conn.close_for_real()
+                        raise
+                    self._migrated = True
+        return conn
+
+    def release(self, conn):
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            conn.close_for_real()
+            return
+        with self._lock:
+            if any(idle is conn for idle in self._idle):
+                return
+            if not self.closed and len(self._idle) < COMPETITION_POOL_SIZE:
+                self._idle.append(conn)
+                return
+        conn.close_for_real()
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close_for_real()
+
+class CompetitionRegistry:
+    def __init__(self, capacity=COMPETITION_CACHE_SIZE):
+        self.capacity = capacity
+        self._competitions = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, slug):
+        evicted = None
+        with self._lock:
+            competition = self._competitions.get(slug)
+            if competition is not None:
+                self._competitions.move_to_end(slug)
+                return competition
+            competition = Competition(slug)
+            self._competitions[slug] = competition
+            if len(self._competitions) > self.capacity:
+                _, evicted = self._competitions.popitem(last=False)
+        # connections still in use close themselves when they are released
+        if evicted is not None:
+            evicted.close()
+        return competition
+
+competitions = CompetitionRegistry()
+
+def get_current_competition():
+    if has_request_context():
+        slug = request.environ.get('podium.competition')
+    elif has_app_context():
+        slug = g.get('competition_slug')
+    else:
+        slug = None
+    return competitions.get(slug)
+
+def competition_option(command=None, *, must_exist=True):
+    """Adds --competition to a cli command, so it works on that database.
+    Only init-db passes must_exist=False, anything else opening a mistyped
+    slug would create an empty database for it."""
+    if command is None:
+        return functools.partial(competition_option, must_exist=must_exist)
+
+    @click.option('--competition', default=None, help='Competition slug (defaults to the main database).')
+    @functools.wraps(command)
+    def wrapper(*args, competition=None, **kwargs):
+        if competition is not None and not COMPETITION_SLUG_RE.match(competition):
+            raise click.BadParameter("Use lowercase letters, numbers and dashes.", param_hint='--competition')
+        if competition is not None and must_exist and not os.path.exists(get_competition_db_path(competition)):
+            raise click.BadParameter(f"No competition '{competition}', create it with init-db first.", param_hint='--competition')
+        g.competition_slug = competition
+        return command(*args, **kwargs)
+    return wrapper
+
+# each competition gets its own session cookie, signed with its own salt, so
+# a login in one doesn't carry over to another where the same user id is
+# someone else (a different cookie name alone could just be copied across)
+class CompetitionSessionInterface(SecureCookieSessionInterface):
+    def get_cookie_name(self, app):
+        name = super().get_cookie_name(app)
+        slug = self._slug()
+        return f'{name}_{slug}' if slug else name
+
+    def get_signing_serializer(self, app):
+        serializer = super().get_signing_serializer(app)
+        slug = self._slug()
+        if serializer is not None and slug:
+            serializer.salt = f'{self.salt}:{slug}'
+        return serializer
+
+    def _slug(self):
+        return request.environ.get('podium.competition') if has_request_context() else None
+
+app.session_interface = CompetitionSessionInterface()
+
+@app.before_request
+def check_competition_exists():
+    # only serve competitions that were set up with init-db, so unknown
+    # slugs don't create empty database files
+    slug = request.environ.get('podium.competition')
+    if slug and not os.path.exists(get_competition_db_path(slug)):
+        abort(404)
+
+@app.context_processor
+def inject_competition():
+    return {'competition': get_current_competition()}
+
+# connects to the database of the current competition
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# makes the database tables and adds some data
-def init_db():
-    conn = get_db_connection()
+    return get_current_competition().connect()
+
+# tables that have a write counter in DataVersion
+VERSIONED_TABLES = ('Schools', 'Events', 'Results')
+
+def get_data_version(conn, *tables):
+    tables = tables or VERSIONED_TABLES
+    rows = conn.execute(
+        f"SELECT name, version FROM DataVersion WHERE name IN ({', '.join('?' * len(tables))})",
+        tables
+    ).fetchall()
+    versions = {row['name']: row['version'] for row in rows}
+    return tuple(versions.get(table, 0) for table in tables)
+
+# creates missing tables, columns and triggers. safe to run on a database
+# that already has data, older databases get upgraded in place.
+def migrate_db(conn):
     with conn:
         # Create tables if they don't exist
         conn.executescript('''
@@ -61,24 +303,92 @@ def init_db():
                 username TEXT NOT NULL,
                 action TEXT NOT NULL,
                 event_name TEXT,
+                details TEXT,
                 timestamp DATETIME NOT NULL,
                 FOREIGN KEY(user_id) REFERENCES Users(id)
             );
+            CREATE TABLE IF NOT EXISTS ResultChanges (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id INTEGER NOT NULL,
+                event_name TEXT NOT NULL,
+                change_type TEXT NOT NULL CHECK(change_type IN ('submit', 'edit', 'retract')),
+                first_place_school TEXT,
+                second_place_school TEXT,
+                third_place_school TEXT,
+                first_place_points INTEGER,
+                second_place_points INTEGER,
+                third_place_points INTEGER,
+                user_id INTEGER,
+                changed_at DATETIME NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS StandingsSnapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                change_id INTEGER UNIQUE NOT NULL REFERENCES ResultChanges(id),
+                taken_at DATETIME NOT NULL,
+                state TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_result_changes_changed_at ON ResultChanges(changed_at);
+            CREATE TABLE IF NOT EXISTS DataVersion (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            );
         ''')
 
+        # older databases were made before AuditLog had a details column
+        audit_columns = [row['name'] for row in conn.execute('PRAGMA table_info(AuditLog)')]
+        if 'details' not in audit_columns:
+            conn.execute('ALTER TABLE AuditLog ADD COLUMN details TEXT')
+
+        # bump a per-table counter on every write so in-memory caches can
+        # tell when they are out of date
+        for table in VERSIONED_TABLES:
+            conn.execute('INSERT OR IGNORE INTO DataVersion (name, version) VALUES (?, 0)', (table,))
+            for operation in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table.lower()}_{operation.lower()}_version
+                    AFTER {operation} ON {table}
+                    BEGIN
+                        UPDATE DataVersion SET version = version + 1 WHERE name = '{table}';
+                    END
+                ''')
+
+# makes the database tables and adds some data
+def init_db():
+    competition = get_current_competition()
+    if competition.slug:
+        os.makedirs(COMPETITIONS_DIR, exist_ok=True)
+    conn = competition.connect()
+    migrate_db(conn)
+    with conn:
         # Seed the database with initial data
         with open('seed.sql') as f:
             conn.executescript(f.read())
 
+        # seeded results go straight into Results, so log them too
+        backfill_result_changes(conn)
+
     conn.close()
 
 @app.cli.command("init-db")
+@competition_option(must_exist=False)
 def init_db_command():
     """Clears the existing data and creates new tables."""
     init_db()
     click.echo("Initialized the database.")
 
+@app.cli.command("backfill-history")
+@competition_option
+def backfill_history_command():
+    """Upgrades the tables, then logs results that have no change history and rebuilds the snapshots."""
+    conn = get_db_connection()
+    migrate_db(conn)
+    with conn:
+        count = backfill_result_changes(conn)
+    conn.close()
+    click.echo(f"Logged {count} existing result(s).")
+
 @app.cli.command("create-user")
+@competition_option
 @click.argument("username")
 @click.argument("password")
 @click.argument("role")
@@ -102,18 +412,524 @@ def create_user_command(username, password, role):
     finally:
         conn.close()
 
+# backups
+# copies are made with the sqlite backup api a few pages at a time, pausing
+# between steps so result submissions can get the write lock in between.
+# each copy goes to a .part file first and is renamed when it is complete.
+BACKUP_DIR = os.environ.get('BACKUP_DIR', 'backups')
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', 10))
+BACKUP_PAGES_PER_STEP = 64
+BACKUP_STEP_PAUSE = 0.005  # seconds
+
+def copy_database(source, target):
+    # progress runs after every step, sleeping there hands the database back
+    # to other connections before the next batch of pages is read
+    source.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=lambda status, remaining, total: time.sleep(BACKUP_STEP_PAUSE))
+
+def get_backup_dir(slug=None):
+    # competitions get a folder each, the main database uses BACKUP_DIR itself
+    return os.path.join(BACKUP_DIR, slug) if slug else BACKUP_DIR
+
+def list_backups(backup_dir=None):
+    return sorted(glob.glob(os.path.join(backup_dir or get_backup_dir(get_current_competition().slug), 'podium-*.db')))
+
+def backup_database(backup_dir=None, keep=None, slug=None):
+    """Backs up the given competition, or the current one."""
+    if slug is None:
+        slug = get_current_competition().slug
+    backup_dir = backup_dir or get_backup_dir(slug)
+    keep = BACKUP_KEEP if keep is None else keep
+    os.makedirs(backup_dir, exist_ok=True)
+
+    timestamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S-%f')
+    path = os.path.join(backup_dir, f'podium-{timestamp}.db')
+    partial_path = path + '.part'
+
+    # a plain connection, so backups don't churn the competition LRU. mode=rw
+    # so a missing database is an error instead of a new empty file
+    source = sqlite3.connect(pathlib.Path(get_competition_db_path(slug)).resolve().as_uri() + '?mode=rw', uri=True)
+    target = sqlite3.connect(partial_path)
+    try:
+        copy_database(source, target)
+    finally:
+        target.close()
+        source.close()
+    os.replace(partial_path, path)
+
+    # keep only the newest copies. a backup-db run at the same time may
+    # have removed some already
+    if keep > 0:
+        for old_path in list_backups(backup_dir)[:-keep]:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+    return path
+
+# tables a backup must have before it is allowed to replace the live data
+BACKUP_REQUIRED_TABLES = ('Results', 'Events', 'DataVersion')
+
+def open_backup(path):
+    """Opens a backup read-only (so a bad path can't create an empty file)
+    and checks it really is a podium database."""
+    source = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + '?mode=ro', uri=True)
+    try:
+        check = source.execute('PRAGMA integrity_check').fetchone()[0]
+        if check != 'ok':
+            raise sqlite3.DatabaseError(f"Backup failed the integrity check: {check}")
+        tables = {row[0] for row in source.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = [table for table in BACKUP_REQUIRED_TABLES if table not in tables]
+        if missing:
+            raise sqlite3.DatabaseError(f"{path} is not a podium backup (missing {', '.join(missing)}).")
+    except sqlite3.Error:
+        source.close()
+        raise
+    return source
+
+def restore_database(path):
+    source = open_backup(path)
+    try:
+        target = sqlite3.connect(get_current_competition().db_path)
+        try:
+            live_versions = dict(target.execute('SELECT name, version FROM DataVersion').fetchall())
+            # one pass, not copy_database: the target is the live database and
+            # holds its write lock for the whole copy, pausing only keeps
+            # writers waiting longer
+            source.backup(target)
+            # move the counters past anything the running app has cached
+            with target:
+                for name, version in live_versions.items():
+                    target.execute('UPDATE DataVersion SET version = MAX(version, ?) + 1 WHERE name = ?', (version, name))
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+@app.cli.command("backup-db")
+@competition_option
+@click.option('--dir', 'backup_dir', default=None, help='Where to put the copy (defaults to BACKUP_DIR).')
+@click.option('--keep', default=None, type=int, help='How many copies to keep (defaults to BACKUP_KEEP).')
+def backup_db_command(backup_dir, keep):
+    """Makes an online copy of the database and rotates old copies."""
+    path = backup_database(backup_dir, keep)
+    click.echo(f"Backed up the database to {path}.")
+
+@app.cli.command("restore-db")
+@competition_option
+@click.argument("path", required=False, type=click.Path(exists=True, dir_okay=False))
+@click.confirmation_option(prompt="This replaces the current database. Continue?")
+def restore_db_command(path):
+    """Restores the database from a backup (the newest one by default)."""
+    if path is None:
+        backups = list_backups()
+        if not backups:
+            click.echo(f"No backups found in {get_backup_dir(get_current_competition().slug)}.")
+            return
+        path = backups[-1]
+
+    try:
+        open_backup(path).close()
+    except sqlite3.Error as e:
+        click.echo(f"Error: {e}")
+        return
+
+    # keep a copy of what we are about to overwrite. no rotation here, it
+    # could delete the backup we are restoring from
+    safety_copy = backup_database(keep=0)
+    try:
+        restore_database(path)
+    except sqlite3.DatabaseError as e:
+        click.echo(f"Error: {e}")
+        return
+    click.echo(f"Restored the database from {path} (previous data saved to {safety_copy}).")
+
+# optional background backups, turned on with BACKUP_INTERVAL_MINUTES.
+# started on the first request so cli commands don't start it. every worker
+# process (gunicorn -w N) starts a scheduler, but only the one holding the
+# lock file takes backups, the others wait and take over if it exits.
+# windows has no fcntl, there run a single worker.
+backup_scheduler = {'thread': None}
+backup_scheduler_lock = threading.Lock()
+
+def run_backup_scheduler(interval):
+    if fcntl is not None:
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        # kept open for the life of the process, the os drops the lock when it exits
+        lock_file = open(os.path.join(BACKUP_DIR, '.scheduler.lock'), 'w')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+    while True:
+        time.sleep(interval)
+        for slug in list_competition_slugs():
+            try:
+                backup_database(slug=slug)
+            except (OSError, sqlite3.Error):
+                app.logger.exception("Scheduled backup of %s failed", slug or 'the main database')
+
+@app.before_request
+def start_backup_scheduler():
+    interval_minutes = os.environ.get('BACKUP_INTERVAL_MINUTES')
+    if not interval_minutes or backup_scheduler['thread']:
+        return
+    with backup_scheduler_lock:
+        if backup_scheduler['thread']:
+            return
+        thread = threading.Thread(target=run_backup_scheduler, args=(float(interval_minutes) * 60,), daemon=True, name='backup-scheduler')
+        thread.start()
+        backup_scheduler['thread'] = thread
+
+@app.cli.command("bench-backup")
+@click.option('--requests', 'request_count', default=200, help='Requests per run.')
+@click.option('--threads', default=4, type=click.IntRange(min=1), help='Concurrent clients.')
+def bench_backup_command(request_count, threads):
+    """Measures / latency with and without a backup running alongside."""
+    def measure():
+        latencies = []
+        lock = threading.Lock()
+
+        def worker(count):
+            client = app.test_client()
+            for _ in range(count):
+                start = time.perf_counter()
+                client.get('/')
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed * 1000)
+
+        # spread the leftover requests over the first few workers
+        counts = [request_count // threads + (1 if i < request_count % threads else 0) for i in range(threads)]
+        workers = [threading.Thread(target=worker, args=(count,)) for count in counts if count]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        latencies.sort()
+        return latencies
+
+    def report(label, latencies):
+        if not latencies:
+            click.echo(f"{label:<16} no requests made")
+            return
+        p95 = latencies[math.ceil(len(latencies) * 0.95) - 1]
+        click.echo(f"{label:<16} p50 {statistics.median(latencies):7.2f} ms   p95 {p95:7.2f} ms   max {latencies[-1]:7.2f} ms")
+
+    report("no backup", measure())
+
+    backup_dir = tempfile.mkdtemp()
+    stop = threading.Event()
+    backups_made = [0]
+
+    def keep_backing_up():
+        while not stop.is_set():
+            backup_database(backup_dir, keep=1)
+            backups_made[0] += 1
+
+    backup_thread = threading.Thread(target=keep_backing_up)
+    backup_thread.start()
+    latencies = measure()
+    stop.set()
+    backup_thread.join()
+    shutil.rmtree(backup_dir, ignore_errors=True)
+    report("during backups", latencies)
+    click.echo(f"({backups_made[0]} backups made during the run)")
+
+# front-end bundle
+# `flask build-assets` puts the vendored chart libraries and our js/css into
+# one fingerprinted, minified file each under static/dist, with .gz and .br
+# copies next to them. layout.html uses the bundle when the manifest exists
+# and falls back to the separate files otherwise.
+VENDOR_ASSETS = {
+    'chart.umd.min.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.3/dist/chart.umd.min.js',
+    'chartjs-adapter-date-fns.bundle.min.js': 'https://cdn.jsdelivr.net/npm/chartjs-adapter-date-fns@3.0.0/dist/chartjs-adapter-date-fns.bundle.min.js',
+}
+ASSET_BUNDLES = {
+    'app.js': ['vendor/chart.umd.min.js', 'vendor/chartjs-adapter-date-fns.bundle.min.js', 'js/confetti.js', 'js/main.js'],
+    'app.css': ['css/style.css'],
+}
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+
+asset_manifest_cache = {'mtime': None, 'manifest': None}
+
+def get_dist_dir():
+    return os.path.join(app.static_folder, 'dist')
+
+def get_asset_manifest():
+    path = os.path.join(get_dist_dir(), 'manifest.json')
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if asset_manifest_cache['mtime'] != mtime:
+        with open(path) as f:
+            asset_manifest_cache['manifest'] = json.load(f)
+        asset_manifest_cache['mtime'] = mtime
+    return asset_manifest_cache['manifest']
+
+def build_assets():
+    import rjsmin
+    import rcssmin
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    vendor_dir = os.path.join(app.static_folder, 'vendor')
+    os.makedirs(vendor_dir, exist_ok=True)
+    for filename, url in VENDOR_ASSETS.items():
+        path = os.path.join(vendor_dir, filename)
+        if not os.path.exists(path):
+            click.echo(f"Downloading {url}")
+            with urllib.request.urlopen(url, timeout=30) as response, open(path, 'wb') as f:
+                f.write(response.read())
+
+    dist_dir = get_dist_dir()
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {}
+    for bundle, sources in ASSET_BUNDLES.items():
+        stem, ext = os.path.splitext(bundle)
+        parts = []
+        for source in sources:
+            with open(os.path.join(app.static_folder, source), encoding='utf-8') as f:
+                text = f.read()
+            # vendor files are minified already
+            if '.min.' not in source:
+                text = rjsmin.jsmin(text) if ext == '.js' else rcssmin.cssmin(text)
+            parts.append(text)
+        content = (';\n' if ext == '.js' else '\n').join(parts).encode('utf-8')
+
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        filename = f'{stem}.{digest}{ext}'
+        with open(os.path.join(dist_dir, filename), 'wb') as f:
+            f.write(content)
+        with open(os.path.join(dist_dir, filename + '.gz'), 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli:
+            with open(os.path.join(dist_dir, filename + '.br'), 'wb') as f:
+                f.write(brotli.compress(content))
+        manifest[bundle] = filename
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # drop bundles from earlier builds
+    current = set(manifest.values()) | {'manifest.json'}
+    for filename in os.listdir(dist_dir):
+        if filename.removesuffix('.gz').removesuffix('.br') not in current:
+            os.remove(os.path.join(dist_dir, filename))
+    return manifest
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    """Bundles, minifies and precompresses the front-end assets."""
+    try:
+        manifest = build_assets()
+    except OSError as e:
+        click.echo(f"Could not build assets: {e}")
+        return
+    for bundle, filename in manifest.items():
+        click.echo(f"{bundle} -> static/dist/{filename}")
+
+@app.context_processor
+def inject_asset_bundle():
+    return {'asset_bundle': get_asset_manifest()}
+
+# serves the built bundles, picking the precompressed copy the browser accepts.
+# the filenames change with the content so they can be cached for good.
+@app.route('/assets/<path:filename>')
+def assets(filename):
+    dist_dir = get_dist_dir()
+    path = safe_join(dist_dir, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    served, encoding = filename, None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        # the quality, not just membership: "gzip;q=0" means no gzip
+        if request.accept_encodings[candidate] > 0 and os.path.isfile(path + suffix):
+            served, encoding = filename + suffix, candidate
+            break
+
+    response = send_from_directory(dist_dir, served, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# gzip bigger html/json responses on the way out
+COMPRESS_MIMETYPES = {'text/html', 'application/json', 'text/css', 'text/javascript', 'application/javascript'}
+COMPRESS_MIN_SIZE = 1024
+
+@app.after_request
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed
+            or not 200 <= response.status_code < 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES
+            or request.accept_encodings['gzip'] <= 0):
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.after_request
 def add_header(response):
     """
     Add headers to both force latest content and prevent caching.
+    Built assets are fingerprinted, so they keep their long cache headers.
     """
+    if request.endpoint == 'assets':
+        return response
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
     return response
 
-# gets the school scores
-def get_school_standings(conn):
+# request profiling
+# switched on from /admin/profiles. a sample_rate fraction of requests is
+# profiled, either by a helper thread that samples the request thread's stack
+# (cheap, gives flamegraph-ready folded stacks) or with cProfile (gives a
+# pstats file). requests slower than threshold_ms are kept in a small ring
+# buffer. settings and the buffer belong to the competition, they are per
+# process and go away when the competition drops out of the LRU.
+PROFILE_BUFFER_SIZE = 50
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds
+PROFILE_MODES = ('sampling', 'cprofile')
+PROFILE_SKIP_ENDPOINTS = {'static', 'assets', 'profiles', 'download_profile'}
+
+PROFILE_DEFAULT_SETTINGS = {'enabled': False, 'sample_rate': 0.1, 'threshold_ms': 500, 'mode': 'sampling'}
+profile_ids = itertools.count(1)
+
+class StackSampler:
+    """Counts the stacks seen in one thread, sampled from another thread."""
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='stack-sampler')
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()).encode('utf-8')
+
+# cProfile can only run once per process on python 3.12+ (it sits on
+# sys.monitoring, and there it also sees every thread, not just the request),
+# so only one request at a time gets it. the rest fall back to the sampler.
+cprofile_lock = threading.Lock()
+
+def start_profiler(mode):
+    if mode == 'cprofile' and cprofile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            return profiler, 'cprofile'
+        except ValueError:
+            # some other profiling tool is active
+            cprofile_lock.release()
+    profiler = StackSampler(threading.get_ident())
+    profiler.start()
+    return profiler, 'sampling'
+
+def stop_profiler(profile):
+    if profile['mode'] == 'cprofile':
+        try:
+            profile['profiler'].disable()
+        finally:
+            cprofile_lock.release()
+    else:
+        profile['profiler'].stop()
+
+@app.before_request
+def start_request_profile():
+    competition = get_current_competition()
+    settings = competition.profiler_settings
+    if (not settings['enabled'] or request.endpoint in PROFILE_SKIP_ENDPOINTS
+            or random.random() >= settings['sample_rate']):
+        return
+
+    # profiling must never break the request it is watching
+    try:
+        profiler, mode = start_profiler(settings['mode'])
+    except Exception:
+        app.logger.exception("Could not start the request profiler")
+        return
+    g.profile = {'profiler': profiler, 'mode': mode, 'competition': competition, 'started': time.perf_counter()}
+
+@app.after_request
+def finish_request_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+
+    try:
+        stop_profiler(profile)
+        duration_ms = (time.perf_counter() - profile['started']) * 1000
+        competition = profile['competition']
+        if duration_ms < competition.profiler_settings['threshold_ms']:
+            return response
+
+        if profile['mode'] == 'cprofile':
+            # same bytes pstats.Stats.dump_stats writes
+            data = marshal.dumps(pstats.Stats(profile['profiler']).stats)
+        else:
+            data = profile['profiler'].folded()
+    except Exception:
+        app.logger.exception("Could not finish the request profile")
+        return response
+
+    with competition.captured_profiles_lock:
+        competition.captured_profiles.appendleft({
+            'id': next(profile_ids),
+            'method': request.method,
+            'path': request.script_root + request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 1),
+            'captured_at': datetime.now(ZoneInfo("Asia/Kolkata")),
+            'mode': profile['mode'],
+            'data': data,
+        })
+    return response
+
+@app.teardown_request
+def discard_request_profile(exc):
+    # after_request doesn't run when the view raises, stop the profiler
+    # here so the cProfile slot is freed
+    profile = g.pop('profile', None)
+    if profile is not None:
+        try:
+            stop_profiler(profile)
+        except Exception:
+            app.logger.exception("Could not stop the request profiler")
+
+# gets the school scores, ranked with DENSE_RANK over the tie-break columns
+# (points, then 1st, 2nd and 3rd place finishes). pass max_rank for a top-K
+# list or school for a single row, the ranking is still done over everyone.
+def get_school_standings(conn, max_rank=None, school=None):
     query = """
         WITH EventPoints AS (
             SELECT
@@ -131,38 +947,501 @@ def get_school_standings(conn):
             SELECT first_place_school AS school, first_place_points AS points, 1 AS first_places, 0 AS second_places, 0 AS third_places FROM EventPoints UNION ALL
             SELECT second_place_school AS school, second_place_points AS points, 0 AS first_places, 1 AS second_places, 0 AS third_places FROM EventPoints UNION ALL
             SELECT third_place_school AS school, third_place_points AS points, 0 AS first_places, 0 AS second_places, 1 AS third_places FROM EventPoints
+        ),
+        Totals AS (
+            SELECT
+                school,
+                SUM(points) AS total_points,
+                SUM(first_places) AS first_places,
+                SUM(second_places) AS second_places,
+                SUM(third_places) AS third_places
+            FROM AllPlacements
+            WHERE school IS NOT NULL AND school != ''
+            GROUP BY school
+        ),
+        Ranked AS (
+            SELECT
+                *,
+                DENSE_RANK() OVER (
+                    ORDER BY total_points DESC, first_places DESC, second_places DESC, third_places DESC
+                ) AS rank
+            FROM Totals
         )
-        SELECT
-            school,
-            SUM(points) AS total_points,
-            SUM(first_places) AS first_places,
-            SUM(second_places) AS second_places,
-            SUM(third_places) AS third_places
-        FROM AllPlacements
-        WHERE school IS NOT NULL AND school != ''
-        GROUP BY school
-        ORDER BY total_points DESC, first_places DESC, second_places DESC, third_places DESC, school ASC;
+        SELECT school, total_points, first_places, second_places, third_places, rank
+        FROM Ranked
     """
-    return conn.execute(query).fetchall()
+    conditions = []
+    params = []
+    if max_rank is not None:
+        conditions.append("rank <= ?")
+        params.append(max_rank)
+    if school is not None:
+        conditions.append("school = ?")
+        params.append(school)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY rank ASC, school ASC"
+    return conn.execute(query, params).fetchall()
+
+# result history
+# every submit/edit of a result is appended to ResultChanges along with the
+# points it was worth at the time. every SNAPSHOT_EVERY changes we also save
+# the full state, so a past standings table only needs the nearest snapshot
+# plus a few changes replayed on top of it.
+SNAPSHOT_EVERY = 10
+
+PLACES = ('first', 'second', 'third')
+
+def empty_history_state():
+    # events: event id -> [[school, points, place index], ...]
+    # totals: school -> [points, 1st places, 2nd places, 3rd places]
+    return {'events': {}, 'totals': {}}
+
+def apply_result_change(state, change):
+    key = str(change['event_id'])
+    totals = state['totals']
+
+    # take back whatever this event was worth before
+    for school, points, place in state['events'].pop(key, []):
+        total = totals[school]
+        total[0] -= points
+        total[place + 1] -= 1
+        if not any(total):
+            del totals[school]
+
+    if change['change_type'] == 'retract':
+        return state
+
+    placements = []
+    for place, name in enumerate(PLACES):
+        school = change[f'{name}_place_school']
+        if not school:
+            continue
+        points = change[f'{name}_place_points'] or 0
+        placements.append([school, points, place])
+        total = totals.setdefault(school, [0, 0, 0, 0])
+        total[0] += points
+        total[place + 1] += 1
+    state['events'][key] = placements
+    return state
+
+def rank_history_state(state):
+    """Turns replayed totals into rows shaped like get_school_standings."""
+    ordered = sorted(state['totals'].items(), key=lambda item: (-item[1][0], -item[1][1], -item[1][2], -item[1][3], item[0]))
+    standings = []
+    rank = 0
+    last_school_details = None
+    for school, details in ordered:
+        if details != last_school_details:
+            rank += 1
+        standings.append({
+            'school': school,
+            'total_points': details[0],
+            'first_places': details[1],
+            'second_places': details[2],
+            'third_places': details[3],
+            'rank': rank,
+        })
+        last_school_details = details
+    return standings
+
+def record_result_change(conn, event_id, change_type, user_id=None):
+    """Appends the current result of an event to the history. Call it inside
+    the same transaction that changed Results (or before deleting the event
+    when retracting)."""
+    row = conn.execute("""
+        SELECT e.name, e.first_place_points, e.second_place_points, e.third_place_points,
+               r.first_place_school, r.second_place_school, r.third_place_school
+        FROM Events e LEFT JOIN Results r ON r.event_id = e.id
+        WHERE e.id = ?
+    """, (event_id,)).fetchone()
+    if row is None:
+        return None
+
+    if change_type == 'retract':
+        placements = (None,) * 6
+    else:
+        placements = (row['first_place_school'], row['second_place_school'], row['third_place_school'],
+                      row['first_place_points'], row['second_place_points'], row['third_place_points'])
+
+    cursor = conn.execute("""
+        INSERT INTO ResultChanges (event_id, event_name, change_type,
+                                   first_place_school, second_place_school, third_place_school,
+                                   first_place_points, second_place_points, third_place_points,
+                                   user_id, changed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (event_id, row['name'], change_type, *placements, user_id, datetime.now(timezone.utc)))
+    change_id = cursor.lastrowid
+
+    if change_id % SNAPSHOT_EVERY == 0:
+        save_history_snapshot(conn, change_id, load_history_state(conn, change_id))
+    return change_id
+
+def save_history_snapshot(conn, change_id, state):
+    conn.execute(
+        'INSERT OR REPLACE INTO StandingsSnapshots (change_id, taken_at, state) VALUES (?, ?, ?)',
+        (change_id, datetime.now(timezone.utc), json.dumps(state))
+    )
+
+def load_history_state(conn, change_id):
+    """State after change_id was applied: nearest snapshot + replay."""
+    snapshot = conn.execute(
+        'SELECT change_id, state FROM StandingsSnapshots WHERE change_id <= ? ORDER BY change_id DESC LIMIT 1',
+        (change_id,)
+    ).fetchone()
+    if snapshot:
+        state = json.loads(snapshot['state'])
+        start = snapshot['change_id']
+    else:
+        state = empty_history_state()
+        start = 0
+
+    changes = conn.execute(
+        'SELECT * FROM ResultChanges WHERE id > ? AND id <= ? ORDER BY id',
+        (start, change_id)
+    ).fetchall()
+    for change in changes:
+        apply_result_change(state, change)
+    return state
+
+def get_last_change_id(conn, as_of=None):
+    if as_of is None:
+        row = conn.execute('SELECT MAX(id) FROM ResultChanges').fetchone()
+    else:
+        row = conn.execute(
+            'SELECT MAX(id) FROM ResultChanges WHERE julianday(changed_at) <= julianday(?)',
+            (as_of,)
+        ).fetchone()
+    return row[0] or 0
+
+def get_standings_at(conn, as_of):
+    return rank_history_state(load_history_state(conn, get_last_change_id(conn, as_of)))
+
+def iter_result_history(conn, since_change_id=0):
+    """Yields (change, state) for every change after since_change_id. The
+    same state dict is updated in place, copy it if you need to keep it."""
+    state = load_history_state(conn, since_change_id)
+    changes = conn.execute('SELECT * FROM ResultChanges WHERE id > ? ORDER BY id', (since_change_id,)).fetchall()
+    for change in changes:
+        yield change, apply_result_change(state, change)
+
+def rebuild_history_snapshots(conn):
+    conn.execute('DELETE FROM StandingsSnapshots')
+    for change, state in iter_result_history(conn):
+        if change['id'] % SNAPSHOT_EVERY == 0:
+            save_history_snapshot(conn, change['id'], state)
+
+def backfill_result_changes(conn):
+    """Logs results that were written without history (seed data or older
+    databases), oldest submission first."""
+    missing = conn.execute("""
+        SELECT r.event_id FROM Results r
+        JOIN Events e ON r.event_id = e.id
+        WHERE NOT EXISTS (SELECT 1 FROM ResultChanges c WHERE c.event_id = r.event_id)
+        ORDER BY r.submitted_at ASC, r.id ASC
+    """).fetchall()
+    for row in missing:
+        conn.execute("""
+            INSERT INTO ResultChanges (event_id, event_name, change_type,
+                                       first_place_school, second_place_school, third_place_school,
+                                       first_place_points, second_place_points, third_place_points,
+                                       user_id, changed_at)
+            SELECT e.id, e.name, 'submit',
+                   r.first_place_school, r.second_place_school, r.third_place_school,
+                   e.first_place_points, e.second_place_points, e.third_place_points,
+                   NULL, r.submitted_at
+            FROM Results r JOIN Events e ON r.event_id = e.id
+            WHERE r.event_id = ?
+        """, (row['event_id'],))
+    rebuild_history_snapshots(conn)
+    return len(missing)
+
+# name search for the typeahead inputs
+# prefix matches on the start of any word come first, then fuzzier matches
+# from shared trigrams. the index is rebuilt when the table's DataVersion
+# counter moves.
+class NameIndex:
+    def __init__(self, names):
+        self.names = sorted(names, key=str.lower)
+        self._lookup = set(self.names)
+
+        # (lowercased text from the start of each word, position in names)
+        self._word_starts = []
+        self._trigrams = {}
+        for i, name in enumerate(self.names):
+            lowered = name.lower()
+            for start in range(len(lowered)):
+                if start == 0 or (not lowered[start - 1].isalnum() and lowered[start].isalnum()):
+                    self._word_starts.append((lowered[start:], i))
+            for trigram in self._make_trigrams(lowered):
+                self._trigrams.setdefault(trigram, set()).add(i)
+        self._word_starts.sort()
+
+    @staticmethod
+    def _make_trigrams(text):
+        padded = f'  {text} '
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def __contains__(self, name):
+        return name in self._lookup
+
+    def search(self, query, limit=10):
+        query = query.strip().lower()
+        if not query:
+            return self.names[:limit]
+
+        found = []
+        seen = set()
+
+        # prefix matches, whole name first then any word
+        start = bisect.bisect_left(self._word_starts, (query,))
+        prefix_hits = []
+        for text, i in self._word_starts[start:]:
+            if not text.startswith(query):
+                break
+            if i not in seen:
+                seen.add(i)
+                prefix_hits.append((not self.names[i].lower().startswith(query), i))
+        for _, i in sorted(prefix_hits):
+            found.append(self.names[i])
+            if len(found) >= limit:
+                return found
+
+        # then anything sharing at least half of the query's trigrams
+        query_trigrams = self._make_trigrams(query)
+        scores = {}
+        for trigram in query_trigrams:
+            for i in self._trigrams.get(trigram, ()):
+                if i not in seen:
+                    scores[i] = scores.get(i, 0) + 1
+        needed = len(query_trigrams) / 2
+        for i, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0])):
+            if scores[i] < needed or len(found) >= limit:
+                break
+            found.append(self.names[i])
+        return found
+
+NAME_INDEX_TABLES = {'school': 'Schools', 'event': 'Events'}
+
+def get_name_index(conn, kind):
+    table = NAME_INDEX_TABLES[kind]
+    name_indexes = conn.competition.name_indexes
+    version = get_data_version(conn, table)[0]
+    cached = name_indexes.get(kind)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with conn.competition.name_indexes_lock:
+        cached = name_indexes.get(kind)
+        if cached and cached[0] == version:
+            return cached[1]
+        names = [row['name'] for row in conn.execute(f'SELECT name FROM {table}').fetchall()]
+        index = NameIndex(names)
+        name_indexes[kind] = (version, index)
+        return index
+
+# request coalescing
+# the public pages all get hit at once right after a result goes up. the
+# first request for a (view, data version) does the work and everyone else
+# asking for the same thing waits for it. while a new version is being built
+# the previous one is served for up to SINGLE_FLIGHT_STALE_SECONDS.
+SINGLE_FLIGHT_STALE_SECONDS = 5
+
+class SingleFlight:
+    def __init__(self, stale_seconds=SINGLE_FLIGHT_STALE_SECONDS):
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._latest = {}     # name -> (version, value)
+        self._in_flight = {}  # (name, version) -> flight dict
+
+    def get(self, name, version, compute):
+        with self._lock:
+            latest = self._latest.get(name)
+            if latest and latest[0] == version:
+                return latest[1]
+
+            key = (name, version)
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = {'done': threading.Event(), 'started': time.monotonic(), 'value': None, 'error': None}
+                self._in_flight[key] = flight
+            elif latest and time.monotonic() - flight['started'] < self.stale_seconds:
+                return latest[1]
+
+        if not leader:
+            flight['done'].wait()
+            if flight['error']:
+                raise flight['error']
+            return flight['value']
+
+        try:
+            flight['value'] = compute()
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if flight['error'] is None:
+                    latest = self._latest.get(name)
+                    # a slow build for an older version must not replace a newer one
+                    if latest is None or latest[0] <= version:
+                        self._latest[name] = (version, flight['value'])
+            flight['done'].set()
+        return flight['value']
+
+def get_view_data(name, conn, compute):
+    """Runs compute(conn) once per data version, shared across requests."""
+    return conn.competition.view_cache.get(name, get_data_version(conn), lambda: compute(conn))
+
+# audit log
+# routes call audit() which only puts the entry on a queue. a background
+# thread writes queued entries in batches and looks up the username and event
+# name itself, so the request never waits on it. set AUDIT_DURABLE=1 to make
+# every audit() wait until its entry is committed. the queue is flushed when
+# the process exits.
+AUDIT_DURABLE = os.environ.get('AUDIT_DURABLE') == '1'
+AUDIT_BATCH_SIZE = 100
+AUDIT_FLUSH_INTERVAL = 0.5  # seconds
+
+AUDIT_INSERT = """
+    INSERT INTO AuditLog (user_id, username, action, event_name, details, timestamp)
+    VALUES (?, COALESCE((SELECT username FROM Users WHERE id = ?), 'unknown'), ?,
+            COALESCE(?, (SELECT name FROM Events WHERE id = ?)), ?, ?)
+"""
+
+class AuditWaiter:
+    """What a durable log() or flush() blocks on; error is set if the write failed."""
+    def __init__(self):
+        self.event = threading.Event()
+        self.error = None
+
+    def wait(self):
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+
+class AuditWriter:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def log(self, competition, user_id, action, event_name=None, event_id=None, details=None, durable=None):
+        entry = (competition, (user_id, user_id, action, event_name, event_id, details, datetime.now(timezone.utc)))
+        done = AuditWaiter() if (AUDIT_DURABLE if durable is None else durable) else None
+        self._start()
+        self._queue.put((entry, done))
+        if done:
+            done.wait()
+
+    def flush(self):
+        """Blocks until everything queued so far is written, raises if a write failed."""
+        if self._thread is None:
+            return
+        done = AuditWaiter()
+        self._start()
+        self._queue.put((None, done))
+        done.wait()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            # also restarts a writer thread that died
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name='audit-writer')
+                self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=AUDIT_FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+
+            batch = []
+            waiting = []
+            while True:
+                if item is None:
+                    stopping = True
+                else:
+                    entry, done = item
+                    if entry is not None:
+                        batch.append(entry)
+                    if done is not None:
+                        waiting.append((entry, done))
+                if stopping or len(batch) >= AUDIT_BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            # a bad batch must not kill the thread, flush() would hang forever
+            errors = {}
+            batch_error = None
+            try:
+                if batch:
+                    errors = self._write(batch)
+            except Exception as e:
+                app.logger.exception("Could not write %d audit log entries", len(batch))
+                batch_error = e
+
+            for entry, done in waiting:
+                if entry is None:
+                    # flush waiters hear about any failure in the batch
+                    done.error = batch_error or next(iter(errors.values()), None)
+                else:
+                    done.error = batch_error or errors.get(entry[0])
+                done.event.set()
+
+    def _write(self, batch):
+        by_competition = {}
+        for competition, row in batch:
+            by_competition.setdefault(competition, []).append(row)
+
+        errors = {}
+        for competition, rows in by_competition.items():
+            conn = None
+            try:
+                conn = competition.connect()
+                with conn:
+                    conn.executemany(AUDIT_INSERT, rows)
+            except sqlite3.Error as e:
+                app.logger.exception("Could not write %d audit log entries: %r", len(rows), rows)
+                errors[competition] = e
+            finally:
+                if conn is not None:
+                    conn.close()
+        return errors
+
+audit_writer = AuditWriter()
+atexit.register(audit_writer.stop)
+
+def audit(action, event_name=None, event_id=None, details=None):
+    audit_writer.log(get_current_competition(), session['user_id'], action, event_name=event_name, event_id=event_id, details=details)
 
 # main page
 @app.route('/')
 def standings_view():
     conn = get_db_connection()
-    standings_raw = get_school_standings(conn)
-
-    standings = []
-    rank = 0
-    last_school_details = (-1, -1, -1, -1) # points, 1st, 2nd, 3rd
-    for i, school in enumerate(standings_raw):
-        current_school_details = (school['total_points'], school['first_places'], school['second_places'], school['third_places'])
-        if current_school_details != last_school_details:
-            rank += 1
-        standings.append(dict(school, rank=rank))
-        last_school_details = current_school_details
+    page_data = get_view_data('standings', conn, build_standings_data)
+    conn.close()
+    return render_template('standings.html', **page_data)
 
-    # for showing when the scores were last updated
-    last_updated_query = "SELECT MAX(submitted_at) FROM Results"
+# for showing when the scores were last updated
+def get_last_updated(conn):
+    last_updated_query = "SELECT MAX(changed_at) FROM ResultChanges"
     last_update_row = conn.execute(last_updated_query).fetchone()
     last_update = last_update_row[0] if last_update_row and last_update_row[0] else None
 
@@ -173,6 +1452,11 @@ def standings_view():
         last_updated_utc = last_updated_naive.replace(tzinfo=timezone.utc)
         ist_tz = ZoneInfo("Asia/Kolkata")
         last_updated_time = last_updated_utc.astimezone(ist_tz)
+    return last_updated_time
+
+def build_standings_data(conn):
+    standings = [dict(school) for school in get_school_standings(conn)]
+    last_updated_time = get_last_updated(conn)
 
     all_results_query = """
         SELECT e.name, r.first_place_school, r.second_place_school, r.third_place_school
@@ -182,8 +1466,7 @@ def standings_view():
     """
     all_results = conn.execute(all_results_query).fetchall()
 
-    conn.close()
-    return render_template('standings.html', schools=standings, last_updated=last_updated_time, all_results=all_results)
+    return {'schools': standings, 'last_updated': last_updated_time, 'all_results': all_results}
 
 @app.route('/scoring')
 def scoring_view():
@@ -194,79 +1477,178 @@ def scoring_view():
     return render_template('scoring.html', events=all_events)
 
 # this sends data for the graph on the main page
+# one point per result change, replayed from the history so edits show up
+# where they happened instead of moving the event to the end.
+# optional query parameters keep the payload small on big competitions:
+#   top=N           only the N schools currently ranked highest
+#   max_points=N    downsample each series to N points (LTTB), points then
+#                   come as {x: label index, y: score}, labels becomes an
+#                   {index: label} map of just the indices some point uses
+#                   and points says how many there were before sampling
+#   format=columnar one array per field instead of a Chart.js dataset per school
+GRAPH_MAX_TOP = 100
+GRAPH_MIN_POINTS = 3
+
 @app.route('/api/graph_data')
 def graph_data():
+    top = request.args.get('top', type=int)
+    max_points = request.args.get('max_points', type=int)
+    columnar = request.args.get('format') == 'columnar'
+
     conn = get_db_connection()
-    query = """
-        SELECT r.submitted_at, e.name, r.first_place_school, r.second_place_school, r.third_place_school
-        FROM Results r
-        JOIN Events e ON r.event_id = e.id
-        ORDER BY r.submitted_at ASC
-    """
-    submissions = conn.execute(query).fetchall()
-
-    labels = [sub['name'] for sub in submissions]
-    datasets = {}
-    all_schools = set()
-
-    for sub in submissions:
-        all_schools.add(sub['first_place_school'])
-        all_schools.add(sub['second_place_school'])
-        all_schools.add(sub['third_place_school'])
-
-    for school in all_schools:
-        if not school: continue
-        datasets[school] = {
-            'label': school,
-            'data': [],
-            'borderColor': f'hsla({(hash(school) % 360)}, 90%, 70%, 1)',
-            'backgroundColor': f'hsla({(hash(school) % 360)}, 90%, 70%, 1)',
-            'tension': 0.1
-        }
-    
-    for i, sub in enumerate(submissions):
-        if i > 0:
-            for school in datasets:
-                datasets[school]['data'].append(datasets[school]['data'][i-1])
-        else:
-            for school in datasets:
-                datasets[school]['data'].append(0)
+    payload = get_view_data('graph_data', conn, build_graph_data)
+    conn.close()
 
-        event_points = conn.execute('SELECT first_place_points, second_place_points, third_place_points FROM Events WHERE name = ?', (sub['name'],)).fetchone()
+    labels = payload['labels']
+    series = payload['series']
+    if top is not None:
+        series = series[:max(0, min(top, GRAPH_MAX_TOP))]
+
+    xs = None
+    if max_points is not None and len(labels) > max(max_points, GRAPH_MIN_POINTS):
+        xs, ys = [], []
+        for item in series:
+            sampled = downsample_lttb(list(enumerate(item['data'])), max(max_points, GRAPH_MIN_POINTS))
+            xs.append([x for x, _ in sampled])
+            ys.append([y for _, y in sampled])
+        # the full label list grows with the history, only send what's plotted
+        labels = {x: labels[x] for x in sorted({x for sampled_xs in xs for x in sampled_xs})}
+    else:
+        ys = [item['data'] for item in series]
+    extra = {} if xs is None else {'points': len(payload['labels'])}
+
+    if columnar:
+        return jsonify({
+            'labels': labels,
+            'schools': [item['school'] for item in series],
+            'colors': [item['color'] for item in series],
+            'x': xs,
+            'y': ys,
+            **extra,
+        })
 
-        if sub['first_place_school'] in datasets:
-            datasets[sub['first_place_school']]['data'][i] += event_points['first_place_points']
-        if sub['second_place_school'] in datasets:
-            datasets[sub['second_place_school']]['data'][i] += event_points['second_place_points']
-        if sub['third_place_school'] in datasets:
-            datasets[sub['third_place_school']]['data'][i] += event_points['third_place_points']
+    datasets = []
+    for i, item in enumerate(series):
+        data = ys[i] if xs is None else [{'x': x, 'y': y} for x, y in zip(xs[i], ys[i])]
+        datasets.append({
+            'label': item['school'],
+            'data': data,
+            'borderColor': item['color'],
+            'backgroundColor': item['color'],
+            'tension': 0.1
+        })
+    return jsonify({'labels': labels, 'datasets': datasets, **extra})
+
+def build_graph_data(conn):
+    history = [(change, {school: total[0] for school, total in state['totals'].items()})
+               for change, state in iter_result_history(conn)]
+    # current ranking, schools that dropped out entirely go last
+    final_state = load_history_state(conn, get_last_change_id(conn))
+    ranked = [row['school'] for row in rank_history_state(final_state)]
+
+    labels = []
+    schools = []
+    for change, _ in history:
+        label = change['event_name']
+        if change['change_type'] == 'edit':
+            label += ' (edited)'
+        elif change['change_type'] == 'retract':
+            label += ' (removed)'
+        labels.append(label)
+
+        for name in PLACES:
+            school = change[f'{name}_place_school']
+            if school and school not in schools:
+                schools.append(school)
+
+    order = {school: i for i, school in enumerate(ranked)}
+    schools.sort(key=lambda school: order.get(school, len(order)))
+
+    series = []
+    for school in schools:
+        series.append({
+            'school': school,
+            'color': f'hsla({(hash(school) % 360)}, 90%, 70%, 1)',
+            'data': [points.get(school, 0) for _, points in history],
+        })
+    return {'labels': labels, 'series': series}
+
+def downsample_lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets: keeps the first and last point and, from
+    each bucket in between, the point making the biggest triangle with the
+    previous pick and the next bucket's average."""
+    count = len(points)
+    if threshold >= count or threshold < GRAPH_MIN_POINTS:
+        return points
+
+    sampled = [points[0]]
+    bucket_size = (count - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        next_start = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, count)
+        next_bucket = points[next_start:next_end]
+        avg_x = sum(x for x, _ in next_bucket) / len(next_bucket)
+        avg_y = sum(y for _, y in next_bucket) / len(next_bucket)
+
+        prev_x, prev_y = points[previous]
+        best_area = -1
+        for i in range(int(bucket * bucket_size) + 1, next_start):
+            x, y = points[i]
+            area = abs((prev_x - avg_x) * (y - prev_y) - (prev_x - x) * (avg_y - prev_y))
+            if area > best_area:
+                best_area = area
+                previous = i
+        sampled.append(points[previous])
+
+    sampled.append(points[-1])
+    return sampled
+
+# standings as they were at a given time, e.g. ?t=2025-08-23T09:07:00
+# (times without a timezone are taken as UTC)
+@app.route('/api/standings_at')
+def standings_at():
+    as_of = request.args.get('t')
+    if not as_of:
+        return jsonify({'error': 'Missing t parameter'}), 400
+    try:
+        as_of_dt = datetime.fromisoformat(as_of)
+    except ValueError:
+        return jsonify({'error': 'Invalid time, use ISO 8601'}), 400
+    if as_of_dt.tzinfo is None:
+        as_of_dt = as_of_dt.replace(tzinfo=timezone.utc)
+    as_of_dt = as_of_dt.astimezone(timezone.utc)
 
+    conn = get_db_connection()
+    standings = get_standings_at(conn, as_of_dt)
     conn.close()
-    final_datasets = list(datasets.values())
-    return jsonify({'labels': labels, 'datasets': final_datasets})
+    return jsonify({'as_of': as_of_dt.isoformat(), 'standings': standings})
+
+# how a school's rank moved after each result change
+@app.route('/api/rank_trajectory/<school_name>')
+def rank_trajectory(school_name):
+    conn = get_db_connection()
+    trajectory = []
+    for change, state in iter_result_history(conn):
+        row = next((s for s in rank_history_state(state) if s['school'] == school_name), None)
+        trajectory.append({
+            'changed_at': change['changed_at'],
+            'event': change['event_name'],
+            'change_type': change['change_type'],
+            'rank': row['rank'] if row else None,
+            'total_points': row['total_points'] if row else 0,
+        })
+    conn.close()
+    return jsonify({'school': school_name, 'trajectory': trajectory})
 
 @app.route('/school/<school_name>')
 def school_details(school_name):
     conn = get_db_connection()
-    
-    standings_raw = get_school_standings(conn)
-    
-    standings = []
-    rank = 0
-    last_school_details = (-1, -1, -1, -1)
-    for i, school in enumerate(standings_raw):
-        current_school_details = (school['total_points'], school['first_places'], school['second_places'], school['third_places'])
-        if current_school_details != last_school_details:
-            rank += 1
-        standings.append(dict(school, rank=rank))
-        last_school_details = current_school_details
 
-    current_rank = "N/A"
-    for school in standings:
-        if school['school'] == school_name:
-            current_rank = school['rank']
-            break
-    
+    # rank and totals for just this school, straight from the ranked query
+    school_row = get_school_standings(conn, school=school_name)
+    school_row = school_row[0] if school_row else None
+
     positions_query = """
         SELECT e.name AS event_name,
                CASE
@@ -279,31 +1661,22 @@ def school_details(school_name):
         ORDER BY e.name;
     """
     positions = conn.execute(positions_query, (school_name, school_name, school_name, school_name, school_name, school_name)).fetchall()
-    
-    total_points = 0
-    summary = {'1st Place': 0, '2nd Place': 0, '3rd Place': 0}
-
-    # Get points for each event
-    event_points_query = """
-        SELECT e.name, e.first_place_points, e.second_place_points, e.third_place_points
-        FROM Events e
-    """
-    event_points_rows = conn.execute(event_points_query).fetchall()
-    event_points = {row['name']: row for row in event_points_rows}
-
-    for result in positions:
-        summary[result['position']] += 1
-        points = event_points.get(result['event_name'])
-        if points:
-            if result['position'] == '1st Place':
-                total_points += points['first_place_points']
-            elif result['position'] == '2nd Place':
-                total_points += points['second_place_points']
-            elif result['position'] == '3rd Place':
-                total_points += points['third_place_points']
 
     conn.close()
-    
+
+    if school_row:
+        current_rank = school_row['rank']
+        total_points = school_row['total_points']
+        summary = {
+            '1st Place': school_row['first_places'],
+            '2nd Place': school_row['second_places'],
+            '3rd Place': school_row['third_places'],
+        }
+    else:
+        current_rank = "N/A"
+        total_points = 0
+        summary = {'1st Place': 0, '2nd Place': 0, '3rd Place': 0}
+
     return render_template('school_details.html', 
                            school_name=school_name, 
                            results=positions,
@@ -311,6 +1684,20 @@ def school_details(school_name):
                            total_points=total_points,
                            rank=current_rank)
 
+# typeahead suggestions, e.g. ?type=school&q=del
+@app.route('/api/autocomplete')
+def autocomplete():
+    kind = request.args.get('type', 'school')
+    if kind not in NAME_INDEX_TABLES:
+        return jsonify({'error': 'Unknown type'}), 400
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+
+    conn = get_db_connection()
+    index = get_name_index(conn, kind)
+    conn.close()
+    return jsonify({'results': index.search(query, limit)})
+
 # login page for admin
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -353,6 +1740,12 @@ def admin_dashboard():
         if len(set([first, second, third])) < 3:
             flash("A school cannot be in multiple places for one event.", "danger")
             return redirect(url_for('admin_dashboard'))
+
+        # the inputs are free text now, so make sure they are real schools
+        school_index = get_name_index(conn, 'school')
+        if any(school not in school_index for school in (first, second, third)):
+            flash("Please pick schools from the suggestions list.", "danger")
+            return redirect(url_for('admin_dashboard'))
         
         try:
             with conn:
@@ -361,15 +1754,8 @@ def admin_dashboard():
                     VALUES (?, ?, ?, ?, ?)
                 ''', (event_id, first, second, third, datetime.now(timezone.utc)))
                 conn.execute('UPDATE Events SET results_entered = 1 WHERE id = ?', (event_id,))
-
-                # Audit log
-                user_id = session['user_id']
-                username = conn.execute('SELECT username FROM Users WHERE id = ?', (user_id,)).fetchone()['username']
-                event_name = conn.execute('SELECT name FROM Events WHERE id = ?', (event_id,)).fetchone()['name']
-                conn.execute(
-                    'INSERT INTO AuditLog (user_id, username, action, event_name, timestamp) VALUES (?, ?, ?, ?, ?)',
-                    (user_id, username, 'submit_result', event_name, datetime.now(timezone.utc))
-                )
+                record_result_change(conn, event_id, 'submit', session['user_id'])
+            audit('submit_result', event_id=event_id, details=f"{first} / {second} / {third}")
             flash('Results submitted!', 'success')
         except sqlite3.IntegrityError:
             flash("Results for this event have already been submitted.", "danger")
@@ -381,15 +1767,12 @@ def admin_dashboard():
     # show the page
     all_events = conn.execute('SELECT e.id, e.name, e.results_entered, r.first_place_school, r.second_place_school, r.third_place_school FROM Events e LEFT JOIN Results r ON e.id = r.event_id ORDER BY e.name').fetchall()
 
-    schools_query = "SELECT name FROM Schools ORDER BY name ASC"
-    schools = [row['name'] for row in conn.execute(schools_query).fetchall()]
-
     conn.close()
     
     pending = [e for e in all_events if not e['results_entered']]
     submitted = [e for e in all_events if e['results_entered']]
 
-    return render_template('admin_dashboard.html', pending_events=pending, submitted_events=submitted, schools=schools)
+    return render_template('admin_dashboard.html', pending_events=pending, submitted_events=submitted)
 
 # edit existing results
 @app.route('/edit/<int:event_id>', methods=['GET', 'POST'])
@@ -405,33 +1788,38 @@ def edit_result(event_id):
         second = request.form['second_place']
         third = request.form['third_place']
 
+        error = None
         if len(set([first, second, third])) < 3:
-            flash("A school cannot be in multiple places for one event.", "danger")
+            error = "A school cannot be in multiple places for one event."
+        else:
+            school_index = get_name_index(conn, 'school')
+            if any(school not in school_index for school in (first, second, third)):
+                error = "Please pick schools from the suggestions list."
+
+        if error:
+            flash(error, "danger")
             # if theres an error, we have to load the data again
             result = conn.execute('SELECT * FROM Results WHERE event_id = ?', (event_id,)).fetchone()
             event = conn.execute('SELECT * FROM Events WHERE id = ?', (event_id,)).fetchone()
-            schools_query = "SELECT name FROM Schools ORDER BY name ASC"
-            schools = [row['name'] for row in conn.execute(schools_query).fetchall()]
             conn.close()
-            return render_template('edit_result.html', result=result, event=event, schools=schools)
+            return render_template('edit_result.html', result=result, event=event)
         
-        conn.execute('''
+        # submitted_at stays as the first submission, the edit goes in the history
+        cursor = conn.execute('''
             UPDATE Results
-            SET first_place_school = ?, second_place_school = ?, third_place_school = ?, submitted_at = ?
+            SET first_place_school = ?, second_place_school = ?, third_place_school = ?
             WHERE event_id = ?
-        ''', (first, second, third, datetime.now(timezone.utc), event_id))
-
-        # Audit log
-        user_id = session['user_id']
-        username = conn.execute('SELECT username FROM Users WHERE id = ?', (user_id,)).fetchone()['username']
-        event_name = conn.execute('SELECT name FROM Events WHERE id = ?', (event_id,)).fetchone()['name']
-        conn.execute(
-            'INSERT INTO AuditLog (user_id, username, action, event_name, timestamp) VALUES (?, ?, ?, ?, ?)',
-            (user_id, username, 'edit_result', event_name, datetime.now(timezone.utc))
-        )
+        ''', (first, second, third, event_id))
+        if cursor.rowcount == 0:
+            # no results to edit (retracted meanwhile), don't log a phantom change
+            conn.close()
+            flash('No results for this event.', 'warning')
+            return redirect(url_for('admin_dashboard'))
+        record_result_change(conn, event_id, 'edit', session['user_id'])
 
         conn.commit()
         conn.close()
+        audit('edit_result', event_id=event_id, details=f"{first} / {second} / {third}")
         flash('Results updated!', 'success')
 
         if session.get('role') == 'super_admin':
@@ -447,11 +1835,9 @@ def edit_result(event_id):
         return redirect(url_for('admin_dashboard'))
 
     event = conn.execute('SELECT * FROM Events WHERE id = ?', (event_id,)).fetchone()
-    schools_query = "SELECT name FROM Schools ORDER BY name ASC"
-    schools = [row['name'] for row in conn.execute(schools_query).fetchall()]
     conn.close()
     
-    return render_template('edit_result.html', result=result, event=event, schools=schools)
+    return render_template('edit_result.html', result=result, event=event)
 
 @app.route('/api/predictive_analytics')
 def predictive_analytics():
@@ -504,7 +1890,6 @@ def what_if_scenario():
 
     conn = get_db_connection()
     current_standings = get_school_standings(conn)
-    conn.close()
 
     standings_dict = {row['school']: {'total_points': row['total_points'], 'original_points': row['total_points']} for row in current_standings}
 
@@ -512,6 +1897,7 @@ def what_if_scenario():
         SELECT AVG(first_place_points), AVG(second_place_points), AVG(third_place_points)
         FROM Events
     ''').fetchone()
+    conn.close()
 
     avg_first = avg_points[0] if avg_points[0] is not None else 100
     avg_second = avg_points[1] if avg_points[1] is not None else 75
@@ -543,30 +1929,11 @@ def what_if_scenario():
 
 @app.route('/download_leaderboard_pdf')
 def download_leaderboard_pdf():
+    # wkhtmltopdf is slow, so the pdf is rendered once per data version
     conn = get_db_connection()
-    standings_raw = get_school_standings(conn)
+    pdf = get_view_data('leaderboard_pdf', conn, build_leaderboard_pdf)
     conn.close()
 
-    standings = []
-    rank = 0
-    last_school_details = (-1, -1, -1, -1)
-    for i, school in enumerate(standings_raw):
-        current_school_details = (school['total_points'], school['first_places'], school['second_places'], school['third_places'])
-        if current_school_details != last_school_details:
-            rank += 1
-        standings.append(dict(school, rank=rank))
-        last_school_details = current_school_details
-
-    # Get current time for the timestamp
-    now = datetime.now(ZoneInfo("Asia/Kolkata"))
-    timestamp = now.strftime('%B %d, %Y at %I:%M %p')
-
-    # Render the PDF-specific template
-    rendered_html = render_template('leaderboard_pdf.html', schools=standings, timestamp=timestamp)
-
-    # Generate PDF from the rendered HTML
-    pdf = pdfkit.from_string(rendered_html, False)
-
     # Create a response with the PDF
     response = make_response(pdf)
     response.headers['Content-Type'] = 'application/pdf'
@@ -574,12 +1941,28 @@ def download_leaderboard_pdf():
 
     return response
 
+def build_leaderboard_pdf(conn):
+    standings = [dict(school) for school in get_school_standings(conn)]
+
+    # the pdf is cached until the data changes, so it shows when the results
+    # last changed rather than when this copy happened to be rendered
+    last_updated = get_last_updated(conn)
+
+    # Render the PDF-specific template
+    rendered_html = render_template('leaderboard_pdf.html', schools=standings, last_updated=last_updated)
+
+    # Generate PDF from the rendered HTML
+    return pdfkit.from_string(rendered_html, False)
+
 @app.route('/admin/audit_log')
 def audit_log():
     if 'user_id' not in session or session.get('role') != 'super_admin':
         flash("You are not authorized to access this page.", "danger")
         return redirect(url_for('login'))
 
+    # show entries that are still waiting in the queue too
+    audit_writer.flush()
+
     conn = get_db_connection()
     logs_from_db = conn.execute('SELECT * FROM AuditLog ORDER BY timestamp DESC').fetchall()
     conn.close()
@@ -596,6 +1979,60 @@ def audit_log():
 
     return render_template('audit_log.html', logs=logs)
 
+@app.route('/admin/profiles', methods=['GET', 'POST'])
+def profiles():
+    if 'user_id' not in session or session.get('role') != 'super_admin':
+        flash("You are not authorized to access this page.", "danger")
+        return redirect(url_for('login'))
+
+    competition = get_current_competition()
+    if request.method == 'POST':
+        if request.form.get('action') == 'clear':
+            with competition.captured_profiles_lock:
+                competition.captured_profiles.clear()
+            audit('clear_profiles')
+            flash("Captured profiles cleared.", "success")
+            return redirect(url_for('profiles'))
+
+        sample_rate = request.form.get('sample_rate', type=float)
+        threshold_ms = request.form.get('threshold_ms', type=float)
+        mode = request.form.get('mode')
+        if sample_rate is None or not 0 <= sample_rate <= 1 or threshold_ms is None or threshold_ms < 0 or mode not in PROFILE_MODES:
+            flash("Sample rate must be between 0 and 1, the threshold can't be negative.", "danger")
+        else:
+            competition.profiler_settings.update({
+                'enabled': request.form.get('enabled') == 'on',
+                'sample_rate': sample_rate,
+                'threshold_ms': threshold_ms,
+                'mode': mode,
+            })
+            audit('update_profiler', details=f"{'On' if competition.profiler_settings['enabled'] else 'Off'}, rate {sample_rate}, threshold {threshold_ms} ms, {mode}")
+            flash("Profiler settings saved.", "success")
+        return redirect(url_for('profiles'))
+
+    with competition.captured_profiles_lock:
+        captured = list(competition.captured_profiles)
+    return render_template('profiles.html', settings=competition.profiler_settings, profiles=captured, modes=PROFILE_MODES)
+
+@app.route('/admin/profiles/<int:profile_id>')
+def download_profile(profile_id):
+    if 'user_id' not in session or session.get('role') != 'super_admin':
+        flash("You are not authorized to access this page.", "danger")
+        return redirect(url_for('login'))
+
+    competition = get_current_competition()
+    with competition.captured_profiles_lock:
+        profile = next((p for p in competition.captured_profiles if p['id'] == profile_id), None)
+    if profile is None:
+        flash("That profile is no longer in the buffer.", "warning")
+        return redirect(url_for('profiles'))
+
+    extension = 'pstats' if profile['mode'] == 'cprofile' else 'folded'
+    response = make_response(profile['data'])
+    response.headers['Content-Type'] = 'application/octet-stream' if extension == 'pstats' else 'text/plain; charset=utf-8'
+    response.headers['Content-Disposition'] = f'attachment; filename=profile-{profile_id}.{extension}'
+    return response
+
 @app.route('/admin/users/delete/<int:user_id>', methods=['POST'])
 def delete_user(user_id):
     if 'user_id' not in session or session.get('role') != 'super_admin':
@@ -605,30 +2042,21 @@ def delete_user(user_id):
         return jsonify({'success': False, 'message': 'You cannot delete yourself.'}), 400
 
     conn = get_db_connection()
+    user = conn.execute('SELECT username FROM Users WHERE id = ?', (user_id,)).fetchone()
     conn.execute('DELETE FROM Users WHERE id = ?', (user_id,))
     conn.commit()
     conn.close()
 
+    if user:
+        audit('delete_user', details=f"Deleted user '{user['username']}'")
     return jsonify({'success': True, 'message': 'User deleted successfully.'})
 
 @app.route('/podium')
 def podium():
     conn = get_db_connection()
-    standings_raw = get_school_standings(conn)
+    top_schools = [dict(school) for school in get_school_standings(conn, max_rank=3)]
     conn.close()
 
-    standings = []
-    rank = 0
-    last_school_details = (-1, -1, -1, -1)
-    for i, school in enumerate(standings_raw):
-        current_school_details = (school['total_points'], school['first_places'], school['second_places'], school['third_places'])
-        if current_school_details != last_school_details:
-            rank += 1
-        standings.append(dict(school, rank=rank))
-        last_school_details = current_school_details
-
-    top_schools = [s for s in standings if s['rank'] <= 3]
-
     return render_template('podium.html', top_three=top_schools)
 
 @app.route('/logout')
@@ -663,6 +2091,7 @@ def delete_school(school_id):
     conn.execute('DELETE FROM Schools WHERE id = ?', (school_id,))
     conn.commit()
     conn.close()
+    audit('delete_school', details=f"Deleted school '{school_name}'")
 
     return jsonify({'success': True, 'message': f"School '{school_name}' deleted successfully."})
 
@@ -692,7 +2121,13 @@ def edit_school(school_id):
                 conn.execute('UPDATE Results SET first_place_school = ? WHERE first_place_school = ?', (new_name, old_name))
                 conn.execute('UPDATE Results SET second_place_school = ? WHERE second_place_school = ?', (new_name, old_name))
                 conn.execute('UPDATE Results SET third_place_school = ? WHERE third_place_school = ?', (new_name, old_name))
+                # keep the history under the new name too
+                conn.execute('UPDATE ResultChanges SET first_place_school = ? WHERE first_place_school = ?', (new_name, old_name))
+                conn.execute('UPDATE ResultChanges SET second_place_school = ? WHERE second_place_school = ?', (new_name, old_name))
+                conn.execute('UPDATE ResultChanges SET third_place_school = ? WHERE third_place_school = ?', (new_name, old_name))
+                rebuild_history_snapshots(conn)
                 conn.commit()
+                audit('edit_school', details=f"Renamed school '{old_name}' to '{new_name}'")
                 flash(f"School name changed to '{new_name}'.", "success")
                 conn.close()
                 return redirect(url_for('manage_schools'))
@@ -725,6 +2160,7 @@ def manage_schools():
             try:
                 conn.execute('INSERT INTO Schools (name) VALUES (?)', (school_name,))
                 conn.commit()
+                audit('add_school', details=f"Added school '{school_name}'")
                 flash(f"School '{school_name}' added!", "success")
             except sqlite3.IntegrityError:
                 flash(f"School '{school_name}' already exists.", "danger")
@@ -759,6 +2195,7 @@ def manage_events():
                 (name, first_points, second_points, third_points)
             )
             conn.commit()
+            audit('create_event', event_name=name, details=f"Points {first_points} / {second_points} / {third_points}")
             flash(f"Event '{name}' created successfully.", "success")
         except sqlite3.IntegrityError:
             flash(f"Event '{name}' already exists.", "danger")
@@ -782,12 +2219,21 @@ def edit_event(event_id):
         first_points = request.form['first_place_points']
         second_points = request.form['second_place_points']
         third_points = request.form['third_place_points']
+        points_query = 'SELECT first_place_points, second_place_points, third_place_points FROM Events WHERE id = ?'
         try:
+            old_points = conn.execute(points_query, (event_id,)).fetchone()
             conn.execute(
                 'UPDATE Events SET name = ?, first_place_points = ?, second_place_points = ?, third_place_points = ? WHERE id = ?',
                 (name, first_points, second_points, third_points, event_id)
             )
+            # new point values change the standings from now on, a rename doesn't.
+            # compare what sqlite stored, the form gives us strings
+            new_points = conn.execute(points_query, (event_id,)).fetchone()
+            points_changed = old_points is not None and tuple(old_points) != tuple(new_points)
+            if points_changed and conn.execute('SELECT 1 FROM Results WHERE event_id = ?', (event_id,)).fetchone():
+                record_result_change(conn, event_id, 'edit', session['user_id'])
             conn.commit()
+            audit('edit_event', event_name=name, details=f"Points {first_points} / {second_points} / {third_points}")
             flash(f"Event '{name}' updated successfully.", "success")
         except sqlite3.IntegrityError:
             flash(f"Event '{name}' already exists.", "danger")
@@ -805,9 +2251,14 @@ def delete_event(event_id):
         return redirect(url_for('login'))
 
     conn = get_db_connection()
+    event = conn.execute('SELECT name FROM Events WHERE id = ?', (event_id,)).fetchone()
+    if conn.execute('SELECT 1 FROM Results WHERE event_id = ?', (event_id,)).fetchone():
+        record_result_change(conn, event_id, 'retract', session['user_id'])
     conn.execute('DELETE FROM Events WHERE id = ?', (event_id,))
     conn.commit()
     conn.close()
+    if event:
+        audit('delete_event', event_name=event['name'])
     flash('Event deleted successfully.', 'success')
     return redirect(url_for('manage_events'))
 
@@ -834,6 +2285,7 @@ def manage_users():
                     (username, hashed_password, role)
                 )
                 conn.commit()
+                audit('create_user', details=f"Created {role} '{username}'")
                 flash(f"User '{username}' created successfully.", "success")
             except sqlite3.IntegrityError:
                 flash(f"Username '{username}' already exists.", "danger")
@@ -853,14 +2305,12 @@ def super_admin_dashboard():
 
     conn = get_db_connection()
     all_events = conn.execute('SELECT e.id, e.name, e.results_entered, r.first_place_school, r.second_place_school, r.third_place_school FROM Events e LEFT JOIN Results r ON e.id = r.event_id ORDER BY e.name').fetchall()
-    schools_query = "SELECT name FROM Schools ORDER BY name ASC"
-    schools = [row['name'] for row in conn.execute(schools_query).fetchall()]
     conn.close()
 
     pending = [e for e in all_events if not e['results_entered']]
     submitted = [e for e in all_events if e['results_entered']]
 
-    return render_template('super_admin_dashboard.html', pending_events=pending, submitted_events=submitted, schools=schools)
+    return render_template('super_admin_dashboard.html', pending_events=pending, submitted_events=submitted)
 
 @app.route('/init-first-user')
 def init_first_user():
@@ -880,11 +2330,13 @@ def init_first_user():
 
     hashed_password = generate_password_hash(password, method='scrypt')
     with conn:
-        conn.execute(
+        cursor = conn.execute(
             'INSERT INTO Users (username, password_hash, role) VALUES (?, ?, ?)',
             (username, hashed_password, 'super_admin')
         )
     conn.close()
+    # nobody is logged in yet, so the new user is the actor
+    audit_writer.log(get_current_competition(), cursor.lastrowid, 'create_first_user', details=f"Created super_admin '{username}'")
     return "Initial super admin user created successfully.", 200
 
 if __name__ == '__main__':
@@ -7,6 +7,10 @@ apt-get update && apt-get install -y wkhtmltopdf
 # Install Python dependencies
 pip install -r requirements.txt
 
+# Bundle, minify and precompress the front-end assets into static/dist.
+# This downloads Chart.js once into static/vendor, so run it while online.
+flask build-assets
+
 # Initialize the database on every deployment
 # This is necessary for ephemeral filesystems on free hosting tiers.
 flask init-db
@@ -59,26 +59,77 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // typeahead for school inputs, fills the input's datalist from the server
+    document.querySelectorAll('input[data-autocomplete]').forEach(input => {
+        const datalist = input.list;
+        if (!datalist) return;
+
+        let debounceTimer = null;
+        let lastQuery = null;
+
+        const loadSuggestions = () => {
+            const query = input.value.trim();
+            if (query === lastQuery) return;
+            lastQuery = query;
+
+            const url = `${input.dataset.autocompleteUrl}?type=${encodeURIComponent(input.dataset.autocomplete)}&q=${encodeURIComponent(query)}`;
+            fetch(url)
+                .then(response => response.json())
+                .then(data => {
+                    // a newer request may have finished first
+                    if (query !== input.value.trim()) return;
+                    datalist.innerHTML = '';
+                    (data.results || []).forEach(name => {
+                        const option = document.createElement('option');
+                        option.value = name;
+                        datalist.appendChild(option);
+                    });
+                })
+                .catch(error => console.error('Error getting suggestions:', error));
+        };
+
+        input.addEventListener('input', () => {
+            clearTimeout(debounceTimer);
+            debounceTimer = setTimeout(loadSuggestions, 150);
+        });
+        input.addEventListener('focus', loadSuggestions);
+    });
+
     // code for the score graph
     const chartContainer = document.getElementById('scoreChart')?.parentElement;
     const ctx = document.getElementById('scoreChart');
 
     if (chartContainer && ctx) {
         try {
-            fetch('/api/graph_data')
+            // top 10 schools, about one point every 4 pixels, in the compact format
+            const maxPoints = Math.max(20, Math.floor(chartContainer.clientWidth / 4));
+            fetch(`${ctx.dataset.url}?top=10&max_points=${maxPoints}&format=columnar`)
                 .then(response => response.json())
                 .then(data => {
                     // if no data, hide the chart
-                    if (!data || !data.labels || data.labels.length === 0) {
+                    if (!data || !data.labels || Object.keys(data.labels).length === 0) {
                         chartContainer.style.display = 'none';
                         return;
                     }
 
+                    // turn the columns back into chart datasets, downsampled
+                    // series come with the label index of each point in x and
+                    // labels is then a map holding only those indices
+                    const sampled = Boolean(data.x);
+                    const labelAt = index => data.labels[index] ?? '';
+                    const datasets = data.schools.map((school, i) => ({
+                        label: school,
+                        data: data.x ? data.x[i].map((x, j) => ({ x: x, y: data.y[i][j] })) : data.y[i],
+                        borderColor: data.colors[i],
+                        backgroundColor: data.colors[i],
+                        tension: 0.1
+                    }));
+
                     const myChart = new Chart(ctx, {
                         type: 'line',
                         data: {
-                            labels: data.labels,
-                            datasets: data.datasets
+                            labels: sampled ? undefined : data.labels,
+                            datasets: datasets
                         },
                         options: {
                             responsive: true,
@@ -97,14 +148,14 @@ document.addEventListener('DOMContentLoaded', function() {
                                 tooltip: {
                                     callbacks: {
                                         title: function(context) {
-                                            return context[0].label;
+                                            return sampled ? labelAt(context[0].parsed.x) : context[0].label;
                                         },
                                         label: function(context) {
                                             let label = context.dataset.label || '';
                                             if (label) {
                                                 label += ': ';
                                             }
-                                            label += context.raw + ' points';
+                                            label += context.parsed.y + ' points';
                                             return label;
                                         }
                                     }
@@ -117,7 +168,18 @@ document.addEventListener('DOMContentLoaded', function() {
                                 }
                             },
                             scales: {
-                                x: {
+                                x: sampled ? {
+                                    // a number axis over the label indices, ticks only where there is a label
+                                    type: 'linear',
+                                    min: 0,
+                                    max: data.points - 1,
+                                    afterBuildTicks: axis => {
+                                        axis.ticks = Object.keys(data.labels).map(index => ({ value: Number(index) }));
+                                    },
+                                    title: { display: true, text: 'Events', color: '#e0e0e0' },
+                                    ticks: { color: '#e0e0e0', callback: value => labelAt(value) },
+                                    grid: { color: '#444' }
+                                } : {
                                     title: { display: true, text: 'Events', color: '#e0e0e0' },
                                     ticks: { color: '#e0e0e0' },
                                     grid: { color: '#444' }